@@ -0,0 +1,120 @@
+"""
+Backfills the history store with past IRSA daily reports.
+
+    python backfill_history.py --from 2025-06-01 --to 2025-09-30
+
+Downloads run concurrently (bounded by --concurrency) and PDFs are parsed
+in a process pool across all cores. Progress is saved after every date,
+so an interrupted run picks up where it stopped.
+"""
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from services import history_store
+from services.scraper import HTTP_HEADERS, REPORT_URL, parse_report_pdf
+
+PROGRESS_FILE = "data/backfill_progress.json"
+
+def _load_progress():
+    """Dates (dd-mm-yyyy) already stored or known to have no report"""
+    try:
+        with open(PROGRESS_FILE, 'r') as f:
+            progress = json.load(f)
+        return set(progress.get("done", [])), set(progress.get("missing", []))
+    except Exception:
+        return set(), set()
+
+def _save_progress(done, missing):
+    os.makedirs(os.path.dirname(PROGRESS_FILE), exist_ok=True)
+    tmp_path = f"{PROGRESS_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"done": sorted(done), "missing": sorted(missing)}, f)
+    os.replace(tmp_path, PROGRESS_FILE)
+
+def parse_report(date_str, body):
+    """Runs in a pool worker. Returns None if the PDF can't be parsed or has no readings."""
+    try:
+        data = parse_report_pdf(body)
+    except Exception as e:
+        print(f"Error reading report for {date_str}: {e}")
+        return None
+    if not history_store.has_readings(data):
+        # Every field defaulted: not a flood report (or an unrecognised layout)
+        print(f"No readings found in report for {date_str}")
+        return None
+    data["date"] = date_str
+    data["source"] = f"Official IRSA Report ({date_str})"
+    return data
+
+async def backfill(start, end, concurrency=8, workers=None, report_url=REPORT_URL):
+    done, missing = _load_progress()
+    dates = []
+    day = start
+    while day <= end:
+        date_str = day.strftime("%d-%m-%Y")
+        if date_str not in done and date_str not in missing:
+            dates.append(date_str)
+        day += timedelta(days=1)
+
+    print(f"Backfilling {len(dates)} dates ({len(done)} done, {len(missing)} missing before)")
+    if not dates:
+        return done, missing
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def handle(client, pool, date_str):
+        url = report_url.format(date=date_str)
+        async with semaphore:
+            try:
+                response = await client.get(url)
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")  # not recorded: retried next run
+                return
+
+        if response.status_code == 404:
+            missing.add(date_str)
+        elif response.status_code != 200:
+            print(f"Error fetching {url}: HTTP {response.status_code}")  # retried next run
+            return
+        else:
+            try:
+                data = await loop.run_in_executor(pool, parse_report, date_str, response.content)
+            except Exception as e:
+                # Pool failure (e.g. BrokenProcessPool), not a bad PDF: retried next run
+                print(f"Error parsing report for {date_str}: {e}")
+                return
+            if data is None:
+                missing.add(date_str)
+            else:
+                history_store.record_report(data)
+                done.add(date_str)
+                print(f"Stored report for {date_str}")
+        _save_progress(done, missing)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(headers=HTTP_HEADERS, timeout=30, follow_redirects=True, limits=limits) as client:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            await asyncio.gather(*(handle(client, pool, d) for d in dates))
+
+    print(f"Backfill finished: {len(done)} reports stored, {len(missing)} dates without a report")
+    return done, missing
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--from", dest="start", required=True, type=date.fromisoformat, help="first date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, default=datetime.now().date(), help="last date, YYYY-MM-DD (default today)")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel downloads")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: all cores)")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.start, args.end, args.concurrency, args.workers))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compares PDF text extraction modes on synthetic IRSA reports:
+  full     - extract_text of every page (the original path)
+  targeted - extract_report_text: only table regions, stops early
+
+Run from apps/backend/python:
+    python -m benchmarks.bench_extraction
+"""
+import io
+import time
+
+import pdfplumber
+
+from benchmarks.sample_reports import make_report_pdf
+from services.scraper import extract_full_text, extract_report_text, parse_pdf_text
+
+SAMPLES = {
+    "1 page table": dict(title_pages=0, notes_pages=0),
+    "title + table": dict(title_pages=1, notes_pages=0),
+    "title + table + 5 notes": dict(title_pages=1, notes_pages=5),
+    "title + table + 20 notes": dict(title_pages=1, notes_pages=20),
+}
+REPEAT = 10
+
+def _time(body, extract):
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        with pdfplumber.open(io.BytesIO(body)) as pdf:
+            data = parse_pdf_text(extract(pdf))
+        best = min(best, time.perf_counter() - start)
+    return best, data
+
+def main():
+    print(f"{'sample':<28}{'full (ms)':>12}{'targeted (ms)':>16}{'speedup':>10}  same result")
+    for name, kwargs in SAMPLES.items():
+        body = make_report_pdf(**kwargs)
+        full, full_data = _time(body, extract_full_text)
+        targeted, targeted_data = _time(body, extract_report_text)
+        same = full_data["risks"] == targeted_data["risks"]
+        print(f"{name:<28}{full * 1000:>12.1f}{targeted * 1000:>16.1f}{full / targeted:>9.1f}x  {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmarks for the IRSA scraper hot path, compared against stored baselines.
+
+    python -m benchmarks.bench_scraper                    # compare with baselines.json
+    python -m benchmarks.bench_scraper --update-baseline  # record new baselines
+
+Run from apps/backend/python. Exits with status 1 if any metric is more
+than --tolerance slower than its baseline.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pdfplumber
+
+from benchmarks.corpus import pdf_cases, text_cases, worst_case_texts
+from services import parse_cache, scraper
+
+# Baselines are seconds per metric (best of --repeat runs)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _quiet(fn):
+    """parse_pdf_text prints missing fields; keep benchmark output readable"""
+    def run(*args):
+        stdout, sys.stdout = sys.stdout, io.StringIO()
+        try:
+            return fn(*args)
+        finally:
+            sys.stdout = stdout
+    return run
+
+def bench_parse(repeat):
+    """Seconds per corpus pass, and worst single report"""
+    parse = _quiet(scraper.parse_pdf_text)
+    texts = list(text_cases().values())
+    metrics = {"parse corpus": _best_of(lambda: [parse(t) for t in texts], repeat)}
+    metrics["parse worst report"] = max(_best_of(lambda: parse(t), repeat) for t in texts)
+    for name, text in worst_case_texts().items():
+        metrics[f"parse worst case: {name}"] = _best_of(lambda: parse(text), repeat)
+    metrics["extract_value missing label, 200 KB"] = _best_of(
+        lambda: scraper.extract_value(worst_case_texts()["no report (200 KB)"], r"INDUS @ TARBELA.*?LEVEL\s*=\s*([\d.]+)"), repeat)
+    return metrics
+
+def bench_extraction(repeat):
+    """pdfplumber cost per PDF, for both extraction modes"""
+    metrics = {}
+    for name, body in pdf_cases().items():
+        for mode, extract in (("full", scraper.extract_full_text), ("targeted", scraper.extract_report_text)):
+            def run():
+                try:
+                    with pdfplumber.open(io.BytesIO(body)) as pdf:
+                        extract(pdf)
+                except Exception:
+                    pass  # malformed input: measuring how fast we fail
+            metrics[f"extract {mode}: {name}"] = _best_of(run, repeat)
+    return metrics
+
+def bench_scrape(repeat):
+    """scrape_pdf_data end to end against a local server, cold and warm parse cache"""
+    body = pdf_cases()["multi-page (30 notes pages)"]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scraper.REPORT_URL = f"http://127.0.0.1:{server.server_port}/Doc/Data{{date}}.pdf"
+    scrape = _quiet(scraper.scrape_pdf_data)
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        def cold():
+            parse_cache.PARSE_CACHE_DIR = tempfile.mkdtemp(dir=tmp)
+            scrape()
+        metrics["scrape_pdf_data, cold parse cache"] = _best_of(cold, repeat)
+        scrape()
+        metrics["scrape_pdf_data, warm parse cache"] = _best_of(scrape, repeat)
+    server.shutdown()
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description="IRSA scraper benchmarks")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write results to {BASELINE_FILE}")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown vs baseline (0.5 = 50%%)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    results.update(bench_parse(args.repeat))
+    results.update(bench_extraction(args.repeat))
+    results.update(bench_scrape(args.repeat))
+
+    try:
+        with open(BASELINE_FILE, 'r') as f:
+            baselines = json.load(f)
+    except FileNotFoundError:
+        baselines = {}
+
+    regressions = []
+    print(f"{'metric':<62}{'now (ms)':>11}{'baseline':>11}")
+    for name, value in results.items():
+        base = baselines.get(name)
+        mark = ""
+        # Ignore sub-millisecond noise
+        if base is not None and value > base * (1 + args.tolerance) and value - base > 0.001:
+            mark = "  REGRESSION"
+            regressions.append(name)
+        base_str = f"{base * 1000:>11.2f}" if base is not None else f"{'-':>11}"
+        print(f"{name:<62}{value * 1000:>11.2f}{base_str}{mark}")
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump({k: round(v, 6) for k, v in results.items()}, f, indent=2)
+        print(f"Baselines written to {BASELINE_FILE}")
+    elif regressions:
+        print(f"{len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Synthetic IRSA report corpus for the scraper benchmarks.
+
+Text cases feed parse_pdf_text directly; PDF cases go through pdfplumber.
+Everything is generated from fixed seeds, so runs are comparable.
+"""
+import random
+
+from benchmarks.sample_reports import make_report_pdf, make_report_text, random_values
+
+def text_cases():
+    """name -> report text"""
+    rng = random.Random(42)
+    cases = {
+        "normal": make_report_text(),
+        "missing dams": make_report_text(skip_sections=("tarbela", "mangla")),
+        "missing barrages": make_report_text(skip_sections=("kalabagh", "chashma", "taunsa", "guddu", "sukkur", "kotri", "rim_stations")),
+        "large (100 notes pages)": make_report_text(notes_pages=100),
+    }
+    for i in range(20):
+        cases[f"random {i}"] = make_report_text(values=random_values(rng), seed=i)
+
+    # Malformed: numbers mangled, labels without values, truncated mid-table
+    normal = cases["normal"]
+    cases["malformed numbers"] = normal.replace("= ", "= ,,").replace(",0", ".0.")
+    cases["labels without values"] = "\n".join(line.split("=")[0] for line in normal.splitlines())
+    cases["truncated"] = normal[: len(normal) // 3]
+    return cases
+
+def worst_case_texts():
+    """Inputs that made the old '.*?' regexes backtrack: headers with no labels after them"""
+    headers = "INDUS @ TARBELA JHELUM @ MANGLA KALABAGH CHASHMA TAUNSA GUDDU SUKKUR KOTRI RIM STATION INFLOWS "
+    return {
+        "headers only (200 KB)": (headers + "no values here 12345 ") * 2000,
+        "labels only (200 KB)": ("LEVEL MEAN INFLOW U/S DISCHARGE D/S DISCHARGE TOTAL " * 4000),
+        "no report (200 KB)": ("canal withdrawals provisional figures " * 5500),
+    }
+
+def pdf_cases():
+    """name -> PDF bytes"""
+    return {
+        "table only": make_report_pdf(title_pages=0),
+        "title + table": make_report_pdf(),
+        "missing section": make_report_pdf(skip_sections=("mangla",)),
+        "multi-page (30 notes pages)": make_report_pdf(notes_pages=30),
+        "malformed bytes": b"%PDF-1.4\n" + bytes(random.Random(7).getrandbits(8) for _ in range(4096)),
+    }
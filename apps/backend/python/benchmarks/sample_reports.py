@@ -0,0 +1,128 @@
+"""
+Synthetic IRSA daily reports for benchmarks.
+
+Reports mimic the real layout: a title page, then a two-column table of
+dams and rim stations ('INDUS @ TARBELA' next to 'KABUL @ NOWSHERA'),
+then barrages and the RIM total, then pages of notes.
+"""
+import io
+import random
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+DEFAULT_VALUES = {
+    "tarbela": {"level": 1491.26, "inflow": 21600, "outflow": 33000},
+    "mangla": {"level": 1214.70, "inflow": 3144, "outflow": 33000},
+    "nowshera": {"discharge": 7400},
+    "marala": {"us": 7721, "ds": 1813},
+    "barrages": {
+        "kalabagh": (38249, 31749),
+        "chashma": (45000, 42000),
+        "taunsa": (51159, 44659),
+        "guddu": (55145, 47625),
+        "sukkur": (43220, 14550),
+        "kotri": (10400, 1245),
+    },
+    "rim_total": 39865,
+}
+
+def random_values(rng=random):
+    """Plausible random readings in the same shape as DEFAULT_VALUES"""
+    return {
+        "tarbela": {"level": round(rng.uniform(1400, 1550), 2), "inflow": rng.randint(10000, 400000), "outflow": rng.randint(10000, 400000)},
+        "mangla": {"level": round(rng.uniform(1100, 1242), 2), "inflow": rng.randint(2000, 300000), "outflow": rng.randint(2000, 300000)},
+        "nowshera": {"discharge": rng.randint(3000, 300000)},
+        "marala": {"us": rng.randint(3000, 800000), "ds": rng.randint(1000, 800000)},
+        "barrages": {name: (rng.randint(5000, 900000), rng.randint(1000, 900000)) for name in DEFAULT_VALUES["barrages"]},
+        "rim_total": rng.randint(20000, 1000000),
+    }
+
+def _table_rows(values, skip_sections=()):
+    """(left, right) text rows of the main table"""
+    t, m, n, mr = values["tarbela"], values["mangla"], values["nowshera"], values["marala"]
+    rows = []
+    if "tarbela" not in skip_sections:
+        rows += [
+            ("INDUS @ TARBELA", "KABUL @ NOWSHERA"),
+            (f"LEVEL = {t['level']:.2f} FEET", f"MEAN DISCHARGE = {n['discharge']:,} Cs"),
+            (f"MEAN INFLOW = {t['inflow']:,} Cs", ""),
+            (f"MEAN OUTFLOW = {t['outflow']:,} Cs", ""),
+        ]
+    if "mangla" not in skip_sections:
+        rows += [
+            ("JHELUM @ MANGLA", "CHENAB @ MARALA"),
+            (f"LEVEL = {m['level']:.2f} FEET", f"MEAN U/S DISCHARGE = {mr['us']:,} Cs"),
+            (f"MEAN INFLOW = {m['inflow']:,} Cs", f"MEAN D/S DISCHARGE = {mr['ds']:,} Cs"),
+            (f"MEAN OUTFLOW = {m['outflow']:,} Cs", ""),
+        ]
+    return rows
+
+def _barrage_lines(values, skip_sections=()):
+    lines = ["BARRAGES"]
+    for name, (us, ds) in values["barrages"].items():
+        if name in skip_sections:
+            continue
+        lines.append(f"{name.upper()} U/S DISCHARGE = {us:,} Cs D/S DISCHARGE = {ds:,} Cs")
+    if "rim_stations" not in skip_sections:
+        lines.append(f"RIM STATION INFLOWS TOTAL = {values['rim_total']:,} Cs")
+    return lines
+
+def _note_lines(rng, count):
+    words = "canal withdrawals provisional figures subject to revision telemetry storage anticipated system losses".split()
+    return [" ".join(rng.choice(words) for _ in range(12)) for _ in range(count)]
+
+def make_report_text(values=None, notes_pages=0, skip_sections=(), seed=0):
+    """The report as plain text, roughly as pdfplumber's extract_text returns it"""
+    values = values or DEFAULT_VALUES
+    rng = random.Random(seed)
+    lines = ["INDUS RIVER SYSTEM AUTHORITY", "DAILY WATER SITUATION REPORT"]
+    lines += [f"{left} {right}".strip() for left, right in _table_rows(values, skip_sections)]
+    lines += _barrage_lines(values, skip_sections)
+    for _ in range(notes_pages):
+        lines += _note_lines(rng, 40)
+    return "\n".join(lines)
+
+def make_report_pdf(values=None, notes_pages=0, skip_sections=(), title_pages=1, seed=0):
+    """
+    The report as PDF bytes: title page(s), the table page, then notes pages.
+    """
+    values = values or DEFAULT_VALUES
+    rng = random.Random(seed)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    width, height = A4
+
+    for _ in range(title_pages):
+        c.setFont("Helvetica-Bold", 16)
+        c.drawString(60, height - 80, "INDUS RIVER SYSTEM AUTHORITY")
+        c.setFont("Helvetica", 10)
+        y = height - 120
+        for line in _note_lines(rng, 30):
+            c.drawString(60, y, line)
+            y -= 14
+        c.showPage()
+
+    c.setFont("Helvetica", 10)
+    c.drawString(60, height - 60, "DAILY WATER SITUATION REPORT")
+    y = height - 100
+    for left, right in _table_rows(values, skip_sections):
+        c.drawString(40, y, left)
+        c.drawString(width / 2 + 10, y, right)
+        y -= 14
+    y -= 14
+    for line in _barrage_lines(values, skip_sections):
+        c.drawString(40, y, line)
+        y -= 14
+    c.showPage()
+
+    for _ in range(notes_pages):
+        c.setFont("Helvetica", 10)
+        y = height - 60
+        for line in _note_lines(rng, 50):
+            c.drawString(40, y, line)
+            y -= 14
+        c.showPage()
+
+    c.save()
+    return buf.getvalue()
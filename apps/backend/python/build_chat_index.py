@@ -0,0 +1,29 @@
+"""
+Builds the chat knowledge base artifacts from flood-knowledge-base.json:
+cleaned, sentence-bounded passages with page and offset metadata, and
+the binary passage table + search index that chat workers memory-map at
+startup (data/chat-index).
+
+    python build_chat_index.py
+
+extract_flood_data.py runs this after re-extracting the PDF.
+"""
+import hashlib
+import json
+
+from services import passages
+
+def build():
+    with open(passages.KNOWLEDGE_BASE_FILE, 'rb') as f:
+        body = f.read()
+    pages = json.loads(body)
+
+    result = passages.build_passages(pages)
+    passages.write_passages(result, hashlib.sha256(body).hexdigest())
+    print(f"Wrote {len(result)} passages from {len(pages)} pages to {passages.PASSAGES_FILE}")
+    with passages.index_lock():
+        passages.write_index(result, passages.index_sources())
+    print(f"Wrote chat index to {passages.INDEX_DIR}")
+
+if __name__ == "__main__":
+    build()
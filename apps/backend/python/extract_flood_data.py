@@ -3,6 +3,8 @@ import os
 from pypdf import PdfReader
 import re
 
+from build_chat_index import build as build_chat_index
+
 def extract_pdf_data():
     pdf_path = "../../../apps/frontend/public/data/a comprehensive report on flood from 1950-2025.pdf"
     output_path = "../../../apps/frontend/public/data/flood-knowledge-base.json"
@@ -45,6 +47,9 @@ def extract_pdf_data():
             
         print(f"Successfully saved knowledge base to {abs_output_path}")
         
+        # Re-segment chat passages from the new knowledge base
+        build_chat_index()
+        
         # Also try to extract a simple timeline (Year: Description) using regex
         # Look for patterns like "1950" or "2010" followed by text
         
@@ -1,17 +1,36 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
-from services.scraper import get_flood_data
+from fastapi.responses import JSONResponse, StreamingResponse
+from services.scraper import get_flood_data, get_flood_payload
+from services import deltas, history_store, payload, risk_engine, updates
 from services.chat_engine import chat_engine
+from services import chat_pool, prefetcher
 import uvicorn
 
 
-app = FastAPI(title="FloodWatch API", description="Backend for scraping river level data")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Scrape IRSA on a schedule so requests only read precomputed data
+    updates.attach(asyncio.get_running_loop())
+    prefetcher.start()
+    chat_engine.watch()
+    await asyncio.to_thread(chat_pool.start)
+    yield
+    chat_pool.stop()
+    chat_engine.stop_watching()
+    prefetcher.stop()
+
+app = FastAPI(title="FloodWatch API", description="Backend for scraping river level data", lifespan=lifespan)
 
 # CORS - Allow Frontend to access
 app.add_middleware(
@@ -27,27 +46,103 @@ def read_root():
     return {"status": "ok", "service": "FloodWatch Python Backend"}
 
 @app.get("/api/flood-data")
-def read_flood_data():
+def read_flood_data(request: Request, since: Optional[int] = None):
     """
     Returns the latest river/dam levels.
-    Cached for 1 hour. Scrapes PDF if cache is old.
+    Served from memory, kept up to date by the background prefetcher.
+    Pre-serialized and precompressed; 304 if the client's ETag is current.
+
+    With ?since=<version>, returns only a JSON-patch style diff from that
+    version, or the full snapshot if the client is too far behind.
+    """
+    if since is None:
+        return payload.respond(request, get_flood_payload())
+    return payload.respond(request, deltas.encoded_delta(since, get_flood_data()))
+
+@app.get("/api/flood-data/stream")
+async def stream_flood_data(request: Request):
+    """
+    Server-sent events: the current snapshot, then only the changed
+    stations whenever a new IRSA report is published.
     """
-    return get_flood_data()
+    return StreamingResponse(
+        updates.stream(request, lambda: get_flood_payload()["identity"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/flood-data/history")
+def read_flood_history(
+    station: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+):
+    """
+    Past readings of one dam/barrage/station from stored IRSA reports,
+    with the risk level of each reading. Without a station, returns the
+    risk of every station per report date. Dates are YYYY-MM-DD, inclusive.
+    """
+    if station is None:
+        return {"reports": risk_engine.classify_history(date_from, date_to)}
+
+    station = station.lower()
+    if station not in history_store.STATIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown station. Use one of: {', '.join(history_store.STATIONS)}")
+    readings = history_store.query(station, date_from, date_to)
+    return {"station": station, "readings": risk_engine.classify_readings(station, readings)}
+
+@app.exception_handler(chat_pool.ChatOverloaded)
+def chat_overloaded(request: Request, exc: chat_pool.ChatOverloaded):
+    return JSONResponse(status_code=503, content={"detail": "Chat is busy, try again shortly"}, headers={"Retry-After": "2"})
 
 @app.get("/api/chat")
-def chat(query: str):
+async def chat(query: str):
     """
     AI Analyst: Searches historical database for query.
     """
-    response = chat_engine.ask(query)
+    response = await chat_pool.run("ask", query)
     return {"response": response}
 
+@app.get("/api/chat/stream")
+async def chat_stream(query: str):
+    """
+    /api/chat as chunked markdown: the header and each passage are sent as
+    soon as they are produced. Ranking runs in the chat pool, under the
+    same pending limit as /api/chat; the answer is formatted here while
+    it streams.
+    """
+    ranked = await chat_pool.run("rank_for_stream", query)
+    return StreamingResponse(
+        chat_engine.stream_answer(query, ranked),
+        media_type="text/markdown",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Upper bound on questions per /api/chat/batch request
+CHAT_BATCH_MAX = 100
+
+class ChatBatch(BaseModel):
+    queries: List[str]
+
+@app.post("/api/chat/batch")
+async def chat_batch(batch: ChatBatch):
+    """
+    Answers many questions in one index pass, e.g. one per province and
+    year for dashboards and report jobs. Responses are in query order.
+    """
+    if len(batch.queries) > CHAT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX} queries per batch")
+    responses = await chat_pool.run("ask_many", batch.queries)
+    return {"responses": [{"query": q, "response": r} for q, r in zip(batch.queries, responses)]}
+
 @app.get("/api/history-risk")
-def history_risk(location: str):
+async def history_risk(location: str):
     """
     Returns historical risk context for a location.
     """
-    risk_summary = chat_engine.get_location_summary(location)
+    risk_summary = chat_engine.precomputed_summary(location)
+    if risk_summary is None:
+        risk_summary = await chat_pool.run("get_location_summary", location)
     return {"risk_analysis": risk_summary}
 
 
@@ -1,132 +1,282 @@
-import json
 import os
 import re
+import threading
+from collections import OrderedDict
+
+from services import passages
+from services.search_index import SearchIndex, TfidfIndex, tokenize
+
+# Location keywords
+LOCATION_MAP = {
+    'lahore': ['lahore', 'lhr'],
+    'karachi': ['karachi', 'khi'],
+    'islamabad': ['islamabad', 'isl'],
+    'sindh': ['sindh'],
+    'punjab': ['punjab'],
+    'balochistan': ['balochistan', 'baluchistan'],
+    'kp': ['khyber pakhtunkhwa', ' kp ', 'kpk'],
+    'peshawar': ['peshawar'],
+    'quetta': ['quetta'],
+    'gilgit': ['gilgit', 'baltistan', 'gb'],
+    'kashmir': ['kashmir', 'ajk', 'azad jammu']
+}
+
+YEAR_RE = re.compile(r'\b(?:19|20)\d{2}\b')
+
+# Query term weights on top of BM25: locations and years dominate, as before
+KEYWORD_WEIGHT = 3
+YEAR_WEIGHT = 50
+LOCATION_WEIGHT = 100
+
+# "bm25" (default) ranks by keyword postings; "tfidf" builds a TF-IDF
+# matrix with bigrams and synonyms at load time, so "inundation losses"
+# also finds "flood damages". Boosts there are added to cosine scores.
+RETRIEVAL_MODE = os.getenv("CHAT_RETRIEVAL_MODE", "bm25").lower()
+TFIDF_YEAR_BOOST = 0.5
+TFIDF_LOCATION_BOOST = 1.0
+
+# Answers are cached per (knowledge base version, normalized query)
+ANSWER_CACHE_SIZE = 256
+
+LOCATION_SUMMARY_QUERY = "flood history damages risks {location}"
+
+def normalize_query(query):
+    return ' '.join(query.lower().split())
+
+def query_keywords(query):
+    return [k for k in tokenize(query) if len(k) > 3]
+
+# Seconds between checks of the knowledge base files for changes
+RELOAD_INTERVAL = int(os.getenv("CHAT_RELOAD_INTERVAL_SECONDS", "30"))
+
+class KnowledgeBase:
+    """
+    One loaded version of the passages and their indexes. ChatEngine swaps
+    in a whole new instance on reload; a query holds on to the instance it
+    started with, so it finishes on the old index.
+    """
+    def __init__(self, version, data=None, index=None, tfidf=None):
+        self.version = version
+        self.data = data if data is not None else passages.PassageTable()
+        self.index = index if index is not None else SearchIndex([])
+        self.tfidf = tfidf
+        self.location_summaries = {}
 
 class ChatEngine:
     def __init__(self):
-        self.data = []
+        self.kb = KnowledgeBase(0)
+        self._answers = OrderedDict()
+        self._answers_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._signature = None
+        self._watch_stop = threading.Event()
+        self._watcher = None
         self.load_data()
+
+    # The current version's parts, for callers that only read them once
+    @property
+    def data(self):
+        return self.kb.data
+
+    @property
+    def index(self):
+        return self.kb.index
+
+    @property
+    def version(self):
+        return self.kb.version
+
+    @property
+    def location_summaries(self):
+        return self.kb.location_summaries
         
     def load_data(self):
-        try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            json_path = os.path.join(base_dir, "../../frontend/public/data/flood-knowledge-base.json")
-            json_path = os.path.normpath(json_path)
-            
-            if os.path.exists(json_path):
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    raw_data = json.load(f)
-                    
-                self.data = []
-                for page in raw_data:
-                    content = page.get('content', '')
-                    page_num = page.get('page', 0)
-                    
-                    # Filter: Remove TOC (1-6) and References (149+)
-                    if page_num <= 6 or page_num >= 149: 
-                        continue
-                        
-                    if content.count('http') > 5 or content.count('...') > 10:
-                        continue
-                        
-                    self.data.append(page)
-                    
-                print(f"Loaded {len(self.data)} pages of flood data.")
-            else:
-                print(f"Warning: Knowledge base not found at {json_path}")
-        except Exception as e:
-            print(f"Error loading chat data: {e}")
-
-    def clean_text(self, text):
-        text = re.sub(r'http\S+', '', text)
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\.{3,}', '', text)
-        return text.strip()
-
-    def extract_context_chunks(self, content, keywords, max_length=200):
-        """Extract contextual chunks around keywords"""
-        content_lower = content.lower()
-        chunks = []
-        
-        for keyword in keywords:
-            keyword = keyword.lower()
-            pos = 0
-            while pos < len(content_lower):
-                pos = content_lower.find(keyword, pos)
-                if pos == -1:
-                    break
-                
-                # Extract context: 100 chars before and 100 chars after
-                start = max(0, pos - 100)
-                end = min(len(content), pos + 100)
-                chunk = content[start:end].strip()
-                
-                if len(chunk) > 20 and chunk not in [c[1] for c in chunks]:
-                    score = sum(1 for k in keywords if k.lower() in chunk.lower())
-                    chunks.append((score, chunk))
-                
-                pos += 1
-        
-        chunks.sort(key=lambda x: x[0], reverse=True)
-        return [c[1] for c in chunks[:max_length]]
+        """
+        Loads the knowledge base into a new version and swaps it in. On
+        failure the current version (possibly empty) keeps serving until
+        the next successful load.
+        """
+        with self._reload_lock:
+            # Taken before reading, so a change made during the load is seen by the next check
+            signature = passages.source_signature()
+            kb = KnowledgeBase(self.kb.version + 1)
+            try:
+                # Pre-cleaned passages and their index, memory-mapped (see build_chat_index.py)
+                kb.data, kb.index = passages.load_index()
+                if RETRIEVAL_MODE == "tfidf":
+                    kb.tfidf = TfidfIndex([kb.data[i]['lower'] for i in range(len(kb.data))])
+                if kb.data:
+                    print(f"Loaded {len(kb.data)} passages of flood data ({len(kb.index.vocab)} terms indexed).")
+            except Exception as e:
+                # Keep serving the current version; _signature is unchanged, so the watcher retries
+                print(f"Error loading chat data: {e}")
+                return
+
+            summaries = self.ask_many([LOCATION_SUMMARY_QUERY.format(location=loc) for loc in LOCATION_MAP], kb)
+            kb.location_summaries = dict(zip(LOCATION_MAP, summaries))
+
+            self.kb = kb
+            self._signature = signature
+            # Cached answers from the previous version no longer match
+            with self._answers_lock:
+                for key in [k for k in self._answers if k[0] != kb.version]:
+                    del self._answers[key]
+
+    def watch(self):
+        """Starts a thread that reloads the knowledge base when its files change"""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._watch_stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="chat-reloader", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+
+    def _watch(self):
+        while not self._watch_stop.wait(RELOAD_INTERVAL):
+            try:
+                if self._signature is None:
+                    print("Retrying chat index load")
+                    self.load_data()
+                elif passages.source_signature() != self._signature:
+                    print("Knowledge base changed, reloading chat index")
+                    self.load_data()
+            except Exception as e:
+                print(f"Chat reload failed: {e}")
 
     def get_relevant_passages(self, query, top_k=5):
+        return self.get_relevant_passages_many([query], top_k)[0]
+
+    def get_relevant_passages_many(self, queries, top_k=5, kb=None):
+        """Ranks passages for every query in one index pass"""
+        kb = kb or self.kb
+        if kb.tfidf is not None:
+            boosts = []
+            for query in queries:
+                locations, years, _ = self._query_features(query)
+                query_boosts = [(years, TFIDF_YEAR_BOOST)]
+                for loc in locations:
+                    query_boosts.append(([t for var in LOCATION_MAP[loc] for t in tokenize(var)], TFIDF_LOCATION_BOOST))
+                boosts.append(query_boosts)
+            results = kb.tfidf.search_many(queries, top_k, boosts)
+        else:
+            results = kb.index.search_many([self._weighted_terms(q) for q in queries], top_k)
+        return [[kb.data[i] for _, i in ranked] for ranked in results]
+
+    def _query_features(self, query):
         query_lower = query.lower()
         
-        # Location keywords
         locations = []
-        location_map = {
-            'lahore': ['lahore', 'lhr'],
-            'karachi': ['karachi', 'khi'],
-            'islamabad': ['islamabad', 'isl'],
-            'sindh': ['sindh'],
-            'punjab': ['punjab'],
-            'balochistan': ['balochistan', 'baluchistan'],
-            'kp': ['khyber pakhtunkhwa', ' kp ', 'kpk'],
-            'peshawar': ['peshawar'],
-            'quetta': ['quetta'],
-            'gilgit': ['gilgit', 'baltistan', 'gb'],
-            'kashmir': ['kashmir', 'ajk', 'azad jammu']
-        }
-        
-        for loc, variations in location_map.items():
+        for loc, variations in LOCATION_MAP.items():
             if any(v in query_lower for v in variations):
                 locations.append(loc)
         
-        years = re.findall(r'\b(19|20)\d{2}\b', query)
-        keywords = [k for k in query.split() if len(k) > 3]
-        
-        results = []
-        for page in self.data:
-            content = page.get('content', '')
-            content_lower = content.lower()
-            score = 0
-            
-            # Very high weight for locations
-            for loc in locations:
-                variations = location_map.get(loc, [loc])
-                for var in variations:
-                    if var in content_lower:
-                        score += 100  # Increased from 50
-            
-            # High weight for years
-            for year in years:
-                if year in content:
-                    score += 50  # Increased from 30
-            
-            # Keyword matching
-            for k in keywords:
-                count = content_lower.count(k)
-                score += count * 3
-            
-            if score > 0:
-                results.append((score, content, page.get('page', 0)))
-        
-        results.sort(key=lambda x: x[0], reverse=True)
-        return [(r[1], r[2]) for r in results[:top_k]]
+        years = YEAR_RE.findall(query)
+        keywords = query_keywords(query)
+        return locations, years, keywords
+
+    def _weighted_terms(self, query):
+        """BM25 query terms, with locations and years as boosted terms"""
+        locations, years, keywords = self._query_features(query)
+        terms = {}
+        for k in keywords:
+            terms[k] = terms.get(k, 0) + KEYWORD_WEIGHT
+        for year in years:
+            terms[year] = terms.get(year, 0) + YEAR_WEIGHT
+        for loc in locations:
+            for var in LOCATION_MAP[loc]:
+                for t in tokenize(var):
+                    terms[t] = terms.get(t, 0) + LOCATION_WEIGHT
+        return terms
 
     def ask(self, query: str) -> str:
-        if not self.data:
+        """Answers query, from the LRU cache when the same normalized query was asked before"""
+        return self.ask_many([query])[0]
+
+    def ask_many(self, queries, kb=None):
+        """
+        Answers for a list of queries, in order. Repeated queries and cache
+        hits are answered once; everything else is ranked in one batched
+        index pass.
+        """
+        kb = kb or self.kb
+        queries = [normalize_query(q) for q in queries]
+        answers = {}
+        with self._answers_lock:
+            for query in queries:
+                key = (kb.version, query)
+                if key in self._answers:
+                    self._answers.move_to_end(key)
+                    answers[query] = self._answers[key]
+
+        pending = []
+        for query in dict.fromkeys(queries):
+            if query in answers:
+                continue
+            builtin = self._builtin_answer(query, kb)
+            if builtin is not None:
+                answers[query] = builtin
+            else:
+                pending.append(query)
+
+        if pending:
+            # Search fo relevant content
+            for query, results in zip(pending, self.get_relevant_passages_many(pending, 12, kb)):
+                answers[query] = self._compose_answer(query, results)
+
+        self._remember(kb.version, answers)
+        return [answers[q] for q in queries]
+
+    def ask_stream(self, query):
+        """
+        ask() as a generator: the header, then each ranked chunk, then the
+        source footer. Cached and built-in answers come as a single piece.
+        """
+        query = normalize_query(query)
+        kb = self.kb
+        ranked = self.rank_for_stream(query, kb)
+        parts = []
+        for part in self.stream_answer(query, ranked):
+            parts.append(part)
+            yield part
+        self._remember(kb.version, {query: "".join(parts)})
+
+    def rank_for_stream(self, query, kb=None):
+        """
+        The expensive half of ask_stream(): a cached or built-in answer
+        (str), or the ranked passages to pass to stream_answer(). Both
+        pickle, so this can run in a chat pool worker.
+        """
+        kb = kb or self.kb
+        query = normalize_query(query)
+        with self._answers_lock:
+            cached = self._answers.get((kb.version, query))
+        if cached is None:
+            cached = self._builtin_answer(query, kb)
+        if cached is not None:
+            return cached
+        return self.get_relevant_passages_many([query], 12, kb)[0]
+
+    def stream_answer(self, query, ranked):
+        """Yields the answer for rank_for_stream()'s result piece by piece"""
+        if isinstance(ranked, str):
+            yield ranked
+            return
+        yield from self._answer_parts(normalize_query(query), ranked)
+
+    def _remember(self, version, answers):
+        with self._answers_lock:
+            if version < self.kb.version:
+                return  # answered on a version that has since been swapped out
+            for query, response in answers.items():
+                self._answers[(version, query)] = response
+                self._answers.move_to_end((version, query))
+            while len(self._answers) > ANSWER_CACHE_SIZE:
+                self._answers.popitem(last=False)
+
+    def _builtin_answer(self, query, kb):
+        if not kb.data:
             return "Knowledge base not loaded."
 
         query_lower = query.lower()
@@ -159,66 +309,59 @@ class ChatEngine:
 5. **Take emergency kit** (water, food, meds, documents)
 6. **Monitor** NDMA alerts (1166 helpline)
 7. **Don't return** until cleared by authorities"""
+        return None
+
+    def _compose_answer(self, query, results):
+        return "".join(self._answer_parts(query, results))
+
+    def _answer_parts(self, query, results):
+        """The markdown answer for ranked results, yielded piece by piece: header, each chunk, footer"""
+        if not results:
+            yield "I couldn't find information on that topic. Try:\n- Specific years (2010, 2022)\n- Cities (Lahore, Karachi)\n- Provinces (Sindh, Punjab, KP)\n- General topics (damages, casualties, preparedness)"
+            return
         
-        # Search fo relevant content
-        passages = self.get_relevant_passages(query, top_k=8)  # Increased from 5
-        
-        if not passages:
-            return "I couldn't find information on that topic. Try:\n- Specific years (2010, 2022)\n- Cities (Lahore, Karachi)\n- Provinces (Sindh, Punjab, KP)\n- General topics (damages, casualties, preparedness)"
-        
-        keywords = [k for k in query.split() if len(k) > 3]
-        
-        # Collect contextual chunks
-        all_chunks = []
+        keywords = query_keywords(query)
         source_pages = set()
         
-        for content, page_num in passages:
-            cleaned = self.clean_text(content)
-            chunks = self.extract_context_chunks(cleaned, keywords, max_length=150)
-            
-            # Add chunks that aren't too generic
-            for chunk in chunks:
-                chunk_lower = chunk.lower()
-                # Skip overly generic chunks
-                if ('asian countries' not in chunk_lower or len(keywords) > 2):
-                    if chunk not in [c[1] for c in all_chunks]:
-                        score = sum(1 for k in keywords if k.lower() in chunk.lower())
-                        all_chunks.append((score, chunk, page_num))
+        # Passages come back best first; skip overly generic ones and near-duplicates
+        seen = set()
+        for passage in results:
+            if 'asian countries' in passage['lower'] and len(keywords) <= 2:
+                continue
+            chunk_key = passage['text'][:40]
+            if chunk_key in seen:
+                continue
+            if not seen:
+                yield "**Historical Flood Records:**\n\n"
+            seen.add(chunk_key)
+            source_pages.add(passage['page'])
+            yield f"• {passage['text']}\n\n"
+            if len(seen) == 6:  # Show up to 6 chunks
+                break
         
-        if not all_chunks:
+        if not seen:
             # Fallback: just return relevant snippets
-            response = "**Historical Flood Data:**\n\n"
-            for content, page_num in passages[:2]:
-                snippet = self.clean_text(content)[:300]
-                response += f"• {snippet}...\n\n"
-                source_pages.add(page_num)
+            yield "**Historical Flood Data:**\n\n"
+            for passage in results[:2]:
+                yield f"• {passage['text'][:300]}...\n\n"
+                source_pages.add(passage['page'])
             
             if source_pages:
-                response += f"\n📄 *Pages {', '.join(map(str, sorted(source_pages)))}*"
-            return response
-        
-        # Sort by score and deduplicate
-        all_chunks.sort(key=lambda x: x[0], reverse=True)
-        
-        response = "**Historical Flood Records:**\n\n"
-        
-        seen = set()
-        count = 0
-        for score, chunk, page_num in all_chunks:
-            chunk_key = chunk[:40]
-            if chunk_key not in seen and count < 6:  # Show up to 6 chunks
-                response += f"• {chunk}\n\n"
-                seen.add(chunk_key)
-                source_pages.add(page_num)
-                count += 1
+                yield f"\n📄 *Pages {', '.join(map(str, sorted(source_pages)))}*"
+            return
         
         if source_pages:
             pages_str = ', '.join(map(str, sorted(source_pages)[:6]))
-            response += f"\n📄 *Source: Pages {pages_str}*"
-        
-        return response
+            yield f"\n📄 *Source: Pages {pages_str}*"
+
+    def precomputed_summary(self, location):
+        """Summary computed at load time for a LOCATION_MAP location, else None"""
+        return self.location_summaries.get(normalize_query(location))
 
     def get_location_summary(self, location: str) -> str:
-        return self.ask(f"flood history damages risks {location}")
+        summary = self.precomputed_summary(location)
+        if summary is None:
+            summary = self.ask(LOCATION_SUMMARY_QUERY.format(location=normalize_query(location)))
+        return summary
 
 chat_engine = ChatEngine()
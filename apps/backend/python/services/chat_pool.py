@@ -0,0 +1,106 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from starlette.concurrency import run_in_threadpool
+
+# Chat retrieval is CPU-bound Python; run it in a warm process pool so it
+# uses all cores and never holds the GIL the flood-data endpoints need.
+# CHAT_POOL_WORKERS=0 runs it in the request thread pool instead.
+POOL_WORKERS = int(os.getenv("CHAT_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Chat calls queued or running at once; beyond that requests are shed
+MAX_PENDING = int(os.getenv("CHAT_POOL_MAX_PENDING", "32"))
+
+_executor = None
+_pending = 0
+_pending_lock = threading.Lock()
+
+class ChatOverloaded(Exception):
+    pass
+
+# How long start() waits for every worker to load the index
+START_TIMEOUT = 120
+
+_worker_ready = None
+
+def _init_worker(ready):
+    # Loads (memory-maps) the chat index once per worker process, and
+    # reloads it in the background when the knowledge base changes
+    global _worker_ready
+    from services.chat_engine import chat_engine
+    chat_engine.watch()
+    _worker_ready = ready
+
+def _wait_ready():
+    # Blocks until every worker runs this, so each one has finished _init_worker
+    _worker_ready.wait(START_TIMEOUT)
+
+def _call(method, args):
+    from services.chat_engine import chat_engine
+    return getattr(chat_engine, method)(*args)
+
+def start():
+    """Spawns the pool and waits for every worker to load the index"""
+    global _executor
+    if _executor is not None or POOL_WORKERS <= 0:
+        return
+
+    # spawn, not fork: the parent already runs the prefetcher and httpx loop threads
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(POOL_WORKERS)
+    _executor = ProcessPoolExecutor(
+        max_workers=POOL_WORKERS,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(ready,),
+    )
+    try:
+        # A worker blocks in _wait_ready until all have joined, so each
+        # of the POOL_WORKERS tasks runs in a different, initialized worker
+        for future in [_executor.submit(_wait_ready) for _ in range(POOL_WORKERS)]:
+            future.result()
+    except Exception as e:
+        print(f"Chat pool failed to start, answering in-process: {e}")
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        return
+    print(f"Chat pool started ({POOL_WORKERS} workers, max {MAX_PENDING} pending)")
+
+def stop():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def run(method, *args):
+    """
+    Awaits chat_engine.<method>(*args) in the pool (or the thread pool when
+    the pool is off). Raises ChatOverloaded instead of queueing more than
+    MAX_PENDING calls.
+    """
+    global _pending, _executor
+    with _pending_lock:
+        if _pending >= MAX_PENDING:
+            raise ChatOverloaded()
+        _pending += 1
+
+    try:
+        executor = _executor
+        if executor is None:
+            return await run_in_threadpool(_call, method, args)
+        try:
+            return await asyncio.wrap_future(executor.submit(_call, method, args))
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM): replace the pool, shed this request
+            print("Chat pool broken, restarting")
+            if _executor is executor:
+                _executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                await run_in_threadpool(start)
+            raise ChatOverloaded()
+    finally:
+        with _pending_lock:
+            _pending -= 1
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+from services import payload
+
+# Recent snapshots by version, so clients can ask for what changed since
+# the version they hold. Older versions get a full snapshot instead.
+DELTA_HISTORY = 48
+
+_versions = OrderedDict()
+_encoded = {}  # (since or "snapshot", version) -> encoded response, for the current version only
+
+def record(data):
+    """Remembers a newly published snapshot"""
+    version = data.get("version")
+    if version is None:
+        return
+    _versions[version] = data
+    while len(_versions) > DELTA_HISTORY:
+        _versions.popitem(last=False)
+    _encoded.clear()
+
+def diff(old, new, path=""):
+    """JSON-patch style operations turning old into new"""
+    ops = []
+    for key, value in new.items():
+        key_path = f"{path}/{key}"
+        if key not in old:
+            ops.append({"op": "add", "path": key_path, "value": value})
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            ops.extend(diff(old[key], value, key_path))
+        elif old[key] != value:
+            ops.append({"op": "replace", "path": key_path, "value": value})
+    for key in old:
+        if key not in new:
+            ops.append({"op": "remove", "path": f"{path}/{key}"})
+    return ops
+
+def encoded_delta(since, data):
+    """
+    Pre-encoded (services/payload.py) answer to "what changed since
+    version `since`": a patch, or the full snapshot if since is unknown.
+    Every unknown or too old since shares one cached snapshot.
+    """
+    version = data.get("version", 0)
+    old = _versions.get(since)
+    known = since == version or (old is not None and since < version)
+    key = (since, version) if known else ("snapshot", version)
+    encoded = _encoded.get(key)
+    if encoded is None:
+        if since == version:
+            body = {"type": "patch", "since": since, "version": version, "patch": []}
+        elif known:
+            body = {"type": "patch", "since": since, "version": version, "patch": diff(old, data)}
+        else:
+            body = {"type": "snapshot", "version": version, "data": data}
+        encoded = payload.encode(body)
+        # record() may clear the cache from the refresh thread meanwhile; return what was built
+        _encoded[key] = encoded
+    return encoded
@@ -0,0 +1,121 @@
+import os
+import sqlite3
+
+import numpy as np
+from contextlib import closing
+from datetime import datetime
+
+# Every official report is kept here, one row per station per report date.
+# The (station, report_date) primary key clusters rows so a range query is
+# a single index scan.
+HISTORY_DB = "data/history.db"
+
+DAMS = ["tarbela", "mangla"]
+BARRAGES = ["kalabagh", "chashma", "taunsa", "guddu", "sukkur", "kotri"]
+RIVER_STATIONS = ["nowshera", "marala"]
+STATIONS = DAMS + BARRAGES + RIVER_STATIONS + ["rim_stations"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS readings (
+    station TEXT NOT NULL,
+    report_date TEXT NOT NULL,  -- ISO yyyy-mm-dd
+    level REAL,
+    inflow REAL,
+    outflow REAL,
+    PRIMARY KEY (station, report_date)
+) WITHOUT ROWID
+"""
+
+def _connect():
+    os.makedirs(os.path.dirname(HISTORY_DB), exist_ok=True)
+    conn = sqlite3.connect(HISTORY_DB, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+    conn.execute(_SCHEMA)
+    return conn
+
+def _rows(data):
+    """
+    (station, level, inflow, outflow) for every monitored point in a report.
+    Fields the parser didn't find (data["defaulted_fields"]) are None, not
+    the fallback values they were filled with.
+    """
+    risks = data.get("risks", {})
+    defaulted = set(data.get("defaulted_fields", []))
+
+    def value(point, *path):
+        return None if ".".join(path) in defaulted else point.get(path[-1])
+
+    for name in DAMS:
+        point = risks.get(name, {})
+        yield name, value(point, name, "level"), value(point, name, "inflow"), value(point, name, "outflow")
+    for group, names in (("barrages", BARRAGES), ("stations", RIVER_STATIONS)):
+        for name in names:
+            point = risks.get(group, {}).get(name, {})
+            yield name, None, value(point, group, name, "inflow"), value(point, group, name, "outflow")
+    yield "rim_stations", None, value(risks.get("rim_stations", {}), "rim_stations", "total_inflow"), None
+
+def has_readings(data):
+    """False if every field of the report was defaulted, i.e. nothing was actually read"""
+    return any(v is not None for row in _rows(data) for v in row[1:])
+
+def record_report(data):
+    """
+    Stores all readings of a parsed report (date 'dd-mm-yyyy'). Re-recording
+    a date replaces it. Defaulted fields are stored as NULL, and a report
+    with no real readings is not stored at all.
+    """
+    if not has_readings(data):
+        print(f"History: report for {data.get('date')} has no readings, not stored")
+        return
+    try:
+        report_date = datetime.strptime(data["date"], "%d-%m-%Y").date().isoformat()
+        with closing(_connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?, ?)",
+                [(station, report_date, level, inflow, outflow) for station, level, inflow, outflow in _rows(data)],
+            )
+    except Exception as e:
+        print(f"History write failed: {e}")
+
+def _date_range(date_from, date_to):
+    sql, params = "", []
+    if date_from:
+        sql += " AND report_date >= ?"
+        params.append(date_from.isoformat())
+    if date_to:
+        sql += " AND report_date <= ?"
+        params.append(date_to.isoformat())
+    return sql, params
+
+def query(station, date_from=None, date_to=None):
+    """Readings for one station between two dates (inclusive), oldest first"""
+    range_sql, range_params = _date_range(date_from, date_to)
+    sql = f"SELECT report_date, level, inflow, outflow FROM readings WHERE station = ?{range_sql} ORDER BY report_date"
+    params = [station] + range_params
+
+    with closing(_connect()) as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [
+        {"date": report_date, "level": level, "inflow": inflow, "outflow": outflow}
+        for report_date, level, inflow, outflow in rows
+    ]
+
+def load_matrix(date_from=None, date_to=None):
+    """
+    All stations' readings between two dates as arrays for vectorized work.
+    Returns (dates, level, inflow, outflow); arrays are (len(dates), len(STATIONS))
+    with NaN where a value wasn't reported.
+    """
+    range_sql, params = _date_range(date_from, date_to)
+    sql = f"SELECT report_date, station, level, inflow, outflow FROM readings WHERE 1 = 1{range_sql}"
+    with closing(_connect()) as conn:
+        rows = conn.execute(sql, params).fetchall()
+
+    dates = sorted({row[0] for row in rows})
+    date_idx = {d: i for i, d in enumerate(dates)}
+    station_idx = {s: i for i, s in enumerate(STATIONS)}
+    values = np.full((3, len(dates), len(STATIONS)), np.nan)
+    for report_date, station, level, inflow, outflow in rows:
+        if station in station_idx:
+            values[:, date_idx[report_date], station_idx[station]] = (level, inflow, outflow)
+    return dates, values[0], values[1], values[2]
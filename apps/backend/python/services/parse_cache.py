@@ -0,0 +1,55 @@
+import json
+import os
+
+# Parsed IRSA reports keyed by a hash of the PDF body. IRSA often
+# republishes the same file, so an unchanged report skips pdfplumber
+# text extraction and parsing entirely.
+PARSE_CACHE_DIR = "data/parse_cache"
+PARSE_CACHE_MAX_BYTES = 5 * 1024 * 1024
+
+def _path(key):
+    return os.path.join(PARSE_CACHE_DIR, f"{key}.json")
+
+def get(key):
+    """Returns the cached parse result for key, or None"""
+    path = _path(key)
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        os.utime(path)  # mark as recently used
+        return data
+    except Exception:
+        return None
+
+def put(key, data):
+    try:
+        os.makedirs(PARSE_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{_path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, _path(key))
+        _evict()
+    except Exception as e:
+        print(f"Parse cache write failed: {e}")
+
+def _evict():
+    """Drops least recently used entries until the cache fits PARSE_CACHE_MAX_BYTES"""
+    entries = []
+    for name in os.listdir(PARSE_CACHE_DIR):
+        if not name.endswith(".json"):
+            continue
+        try:
+            st = os.stat(os.path.join(PARSE_CACHE_DIR, name))
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= PARSE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(os.path.join(PARSE_CACHE_DIR, name))
+        except OSError:
+            pass
+        total -= size
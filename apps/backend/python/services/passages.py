@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from services.file_lock import file_lock
+from services.search_index import SearchIndex
+
+# Chat knowledge base passages. Pages from flood-knowledge-base.json are
+# cleaned and split into sentence-bounded passages once, at ingest, so the
+# chat request path only ranks and returns them.
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KNOWLEDGE_BASE_FILE = os.path.normpath(os.path.join(BASE_DIR, "../../frontend/public/data/flood-knowledge-base.json"))
+PASSAGES_FILE = os.path.join(BASE_DIR, "data/flood-knowledge-passages.json")
+# Binary passage table + search index, memory-mapped read-only by every worker
+INDEX_DIR = os.path.join(BASE_DIR, "data/chat-index")
+INDEX_MANIFEST = "manifest.json"
+INDEX_LOCK_ATTEMPTS = 6
+
+PASSAGE_MAX_CHARS = 400
+PASSAGE_MIN_CHARS = 20
+
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"(])')
+
+def clean_text(text):
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\.{3,}', '', text)
+    return text.strip()
+
+def _keep_page(page):
+    content = page.get('content', '')
+    page_num = page.get('page', 0)
+
+    # Filter: Remove TOC (1-6) and References (149+)
+    if page_num <= 6 or page_num >= 149:
+        return False
+    if content.count('http') > 5 or content.count('...') > 10:
+        return False
+    return True
+
+def _sentences(text):
+    """(offset, sentence) pairs; sentences longer than PASSAGE_MAX_CHARS are cut at word boundaries"""
+    start = 0
+    for m in SENTENCE_END_RE.finditer(text):
+        yield from _cut(text, start, m.start())
+        start = m.end()
+    yield from _cut(text, start, len(text))
+
+def _cut(text, start, end):
+    while end - start > PASSAGE_MAX_CHARS:
+        split = text.rfind(' ', start, start + PASSAGE_MAX_CHARS)
+        if split <= start:
+            split = start + PASSAGE_MAX_CHARS
+        yield start, text[start:split]
+        start = split + 1 if text[split:split + 1] == ' ' else split
+    if end > start:
+        yield start, text[start:end]
+
+def segment_page(content, page_num):
+    """Packs consecutive sentences of one page into passages of at most PASSAGE_MAX_CHARS"""
+    text = clean_text(content)
+    passages = []
+    start, end = None, None
+    for offset, sentence in _sentences(text):
+        if start is not None and offset + len(sentence) - start > PASSAGE_MAX_CHARS:
+            passages.append((start, end))
+            start = None
+        if start is None:
+            start = offset
+        end = offset + len(sentence)
+    if start is not None:
+        passages.append((start, end))
+
+    result = []
+    for start, end in passages:
+        passage = text[start:end]
+        if len(passage) < PASSAGE_MIN_CHARS:
+            continue
+        result.append({
+            "page": page_num,
+            "offset": start,
+            "text": passage,
+            "lower": passage.lower()
+        })
+    return result
+
+def build_passages(pages):
+    passages = []
+    for page in pages:
+        if not _keep_page(page):
+            continue
+        passages.extend(segment_page(page.get('content', ''), page.get('page', 0)))
+    for i, passage in enumerate(passages):
+        passage["id"] = i
+    return passages
+
+def file_hash(path):
+    """sha256 of a file's contents, or None if it can't be read"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def write_passages(passages, source_hash, path=PASSAGES_FILE):
+    """Saves passages with the hash of the knowledge base they were segmented from"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"source_sha256": source_hash, "passages": passages}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def load_passages(source_hash):
+    """
+    Passages from PASSAGES_FILE if they were segmented from the knowledge
+    base with source_hash (or the knowledge base is gone), else segmented
+    from the knowledge base now. Hashes rather than mtimes, since a git
+    checkout gives files arbitrary mtimes. Returns [] if neither exists.
+    """
+    try:
+        with open(PASSAGES_FILE, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if source_hash is None or saved.get("source_sha256") == source_hash:
+            return saved["passages"]
+    except (OSError, ValueError, AttributeError, KeyError):
+        pass
+
+    if source_hash is None:
+        print(f"Warning: Knowledge base not found at {KNOWLEDGE_BASE_FILE}")
+        return []
+    print("Passages file missing or stale, segmenting knowledge base")
+    with open(KNOWLEDGE_BASE_FILE, 'r', encoding='utf-8') as f:
+        return build_passages(json.load(f))
+
+class PassageTable:
+    """
+    Passages as flat arrays: all texts in one UTF-8 blob, text i is
+    blob[text_offsets[i]:text_offsets[i + 1]], and their lowercased forms
+    likewise in lower_blob. Indexing returns the same dicts as
+    build_passages.
+    """
+    ARRAYS = ("blob", "text_offsets", "lower_blob", "lower_offsets", "pages", "offsets")
+
+    def __init__(self, passages=()):
+        self.blob, self.text_offsets = self._pack([p["text"] for p in passages])
+        self.lower_blob, self.lower_offsets = self._pack([p["lower"] for p in passages])
+        self.pages = np.array([p["page"] for p in passages], dtype=np.int32)
+        self.offsets = np.array([p["offset"] for p in passages], dtype=np.int32)
+
+    @staticmethod
+    def _pack(texts):
+        encoded = [t.encode('utf-8') for t in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encoded], out=offsets[1:])
+        return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+    @classmethod
+    def load(cls, directory):
+        table = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(table, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+        return table
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, i):
+        return {
+            "id": i,
+            "page": int(self.pages[i]),
+            "offset": int(self.offsets[i]),
+            "text": self.blob[self.text_offsets[i]:self.text_offsets[i + 1]].tobytes().decode('utf-8'),
+            "lower": self.lower_blob[self.lower_offsets[i]:self.lower_offsets[i + 1]].tobytes().decode('utf-8')
+        }
+
+def write_index(passages, sources, directory=INDEX_DIR):
+    """
+    Writes the passage table and search index to directory, with sources
+    (see index_sources) in its manifest. Built in a temp directory and swapped
+    in, so readers never see a half-written index.
+    """
+    tmp_dir = f"{directory}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    PassageTable(passages).save(tmp_dir)
+    SearchIndex([p["lower"] for p in passages]).save(tmp_dir)
+    with open(os.path.join(tmp_dir, INDEX_MANIFEST), 'w') as f:
+        json.dump({"passages": len(passages), "sources": sources}, f)
+
+    old_dir = f"{directory}.{os.getpid()}.old"
+    if os.path.exists(directory):
+        os.replace(directory, old_dir)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def source_signature():
+    """(mtime, size) of the knowledge base and passages files; changes whenever either is rewritten"""
+    signature = []
+    for source in (KNOWLEDGE_BASE_FILE, PASSAGES_FILE):
+        try:
+            st = os.stat(source)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def index_sources():
+    """Hashes of the files the index is built from"""
+    return {"knowledge_base": file_hash(KNOWLEDGE_BASE_FILE), "passages": file_hash(PASSAGES_FILE)}
+
+def _index_is_fresh(directory, sources):
+    try:
+        with open(os.path.join(directory, INDEX_MANIFEST), 'r') as f:
+            return json.load(f).get("sources") == sources
+    except (OSError, ValueError, AttributeError):
+        return False
+
+@contextmanager
+def index_lock(directory=INDEX_DIR):
+    """
+    Holds the lock file next to directory. A blocking file_lock can still
+    come back unheld (msvcrt gives up after ~10 s), so it is retried
+    INDEX_LOCK_ATTEMPTS times before raising TimeoutError.
+    """
+    for attempt in range(INDEX_LOCK_ATTEMPTS):
+        with file_lock(directory + ".lock") as held:
+            if held:
+                yield
+                return
+        print(f"Chat index lock busy (attempt {attempt + 1}/{INDEX_LOCK_ATTEMPTS})")
+        time.sleep(1)
+    raise TimeoutError(f"Could not lock {directory}.lock")
+
+def load_index(directory=INDEX_DIR):
+    """
+    (PassageTable, SearchIndex) memory-mapped from directory. A missing or
+    stale index is rebuilt from the passages and written back first, so
+    only the first worker after a knowledge base change pays for it.
+    Held under index_lock: other processes wait for a rebuild instead of
+    finding the directory mid-swap, then see it fresh. Raises if the lock
+    can't be had; ChatEngine retries the load.
+    """
+    with index_lock(directory):
+        sources = index_sources()
+        if not _index_is_fresh(directory, sources):
+            passages = load_passages(sources["knowledge_base"])
+            try:
+                write_index(passages, sources, directory)
+            except OSError as e:
+                print(f"Could not write chat index, keeping it in memory: {e}")
+                return PassageTable(passages), SearchIndex([p["lower"] for p in passages])
+        return PassageTable.load(directory), SearchIndex.load(directory)
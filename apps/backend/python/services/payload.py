@@ -0,0 +1,57 @@
+import gzip
+import hashlib
+import json
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+def encode(data):
+    """
+    Serializes data once, with gzip/brotli variants and a strong ETag,
+    so each request just picks a ready-made body.
+    """
+    body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    encoded = {
+        "etag": f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=9),
+    }
+    if brotli:
+        encoded["br"] = brotli.compress(body, quality=11)
+    return encoded
+
+def _accepted(accept_encoding):
+    """Encodings the client accepts (q > 0)"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+def _matches(if_none_match, etag):
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def respond(request: Request, encoded, media_type="application/json"):
+    """304 if the client's copy is current, else the best precompressed body"""
+    headers = {"ETag": encoded["etag"], "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match", ""), encoded["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    accepted = _accepted(request.headers.get("accept-encoding", ""))
+    for encoding in ("br", "gzip"):
+        if encoding in encoded and encoding in accepted:
+            headers["Content-Encoding"] = encoding
+            return Response(encoded[encoding], media_type=media_type, headers=headers)
+    return Response(encoded["identity"], media_type=media_type, headers=headers)
@@ -315,7 +315,7 @@ class PDFReportGenerator:
         # Barrage monitoring
         barrages = risks.get('barrages', {})
         for name, data in barrages.items():
-            if data.get('risk') in ['WARNING', 'DANGER']:
+            if data.get('risk') in ['WARNING', 'DANGER', 'EXTREME']:
                 recommendations.append(f"• Monitor {name.capitalize()} Barrage - elevated risk level detected.")
         
         # General recommendations
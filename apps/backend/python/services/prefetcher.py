@@ -0,0 +1,68 @@
+import os
+import threading
+from datetime import datetime
+
+import schedule
+
+from services import scraper
+
+# Polling cadence (minutes). IRSA usually publishes Data{dd-mm-yyyy}.pdf
+# in the morning, so poll more often inside that window.
+PREFETCH_INTERVAL = int(os.getenv("PREFETCH_INTERVAL_MINUTES", "60"))
+PREFETCH_PEAK_INTERVAL = int(os.getenv("PREFETCH_PEAK_INTERVAL_MINUTES", "10"))
+PUBLISH_WINDOW = os.getenv("IRSA_PUBLISH_WINDOW", "08:00-12:00")
+
+_scheduler = schedule.Scheduler()
+_stop = threading.Event()
+_thread = None
+
+def _in_publish_window(now=None):
+    now = (now or datetime.now()).strftime("%H:%M")
+    start, end = PUBLISH_WINDOW.split("-")
+    return start <= now < end
+
+def poll(peak_only=False):
+    """Fetches today's report unless it is already in memory"""
+    if peak_only and not _in_publish_window():
+        return
+
+    today = datetime.now().strftime("%d-%m-%Y")
+    if scraper.has_report_for(today):
+        return
+
+    print(f"Prefetch: polling IRSA for {today} report")
+    try:
+        scraper.refresh_flood_data()
+    except Exception as e:
+        print(f"Prefetch failed: {e}")
+
+def _run():
+    poll()  # warm up on startup
+    while not _stop.wait(30):
+        # Another worker may have refreshed while this one deferred
+        scraper.adopt_newer_cache()
+        _scheduler.run_pending()
+
+def start():
+    """Starts the refresher thread. Requests then only read precomputed data."""
+    global _thread
+    if _thread and _thread.is_alive():
+        return
+
+    _scheduler.clear()
+    _scheduler.every(PREFETCH_INTERVAL).minutes.do(poll)
+    _scheduler.every(PREFETCH_PEAK_INTERVAL).minutes.do(poll, peak_only=True)
+
+    scraper.refresh_on_read = False
+    _stop.clear()
+    _thread = threading.Thread(target=_run, name="irsa-prefetcher", daemon=True)
+    _thread.start()
+    print(f"Prefetcher started (every {PREFETCH_INTERVAL} min, {PREFETCH_PEAK_INTERVAL} min during {PUBLISH_WINDOW})")
+
+def stop():
+    global _thread
+    _stop.set()
+    if _thread:
+        _thread.join(timeout=5)
+        _thread = None
+    scraper.refresh_on_read = True
@@ -0,0 +1,102 @@
+import numpy as np
+
+from services import history_store
+
+# Risk labels, by band index (number of thresholds reached)
+RISK_LEVELS = np.array(["NORMAL", "WARNING", "DANGER", "EXTREME"])
+
+# Thresholds per monitored point, in history_store.STATIONS order.
+# Discharge bands (cusecs) follow the FFC flood categories: medium, high
+# and very high flood. Level bands (feet) approach and pass each dam's
+# maximum conservation level. Discharge is the inflow (U/S for barrages).
+_BANDS = {
+    #                 level (ft)                discharge (cusecs)
+    "tarbela":      ((1545.0, 1550.0, 1552.0), (375000, 500000, 650000)),
+    "mangla":       ((1237.0, 1242.0, 1245.0), (225000, 350000, 500000)),
+    "kalabagh":     (None,                     (400000, 500000, 650000)),
+    "chashma":      (None,                     (400000, 500000, 650000)),
+    "taunsa":       (None,                     (400000, 500000, 650000)),
+    "guddu":        (None,                     (450000, 600000, 750000)),
+    "sukkur":       (None,                     (450000, 600000, 750000)),
+    "kotri":        (None,                     (450000, 600000, 700000)),
+    "nowshera":     (None,                     (110000, 150000, 200000)),
+    "marala":       (None,                     (150000, 250000, 400000)),
+    "rim_stations": (None,                     (500000, 700000, 900000)),
+}
+STATIONS = history_store.STATIONS
+LEVEL_BANDS = np.array([_BANDS[s][0] or (np.inf,) * 3 for s in STATIONS])
+FLOW_BANDS = np.array([_BANDS[s][1] for s in STATIONS], dtype=float)
+
+def classify_arrays(level, inflow, outflow, stations=STATIONS):
+    """
+    Classifies many readings at once. level/inflow/outflow have shape
+    (..., len(stations)); NaN means not reported.
+    Returns (risk index per point, overall risk index, inflow - outflow).
+    """
+    idx = [STATIONS.index(s) for s in stations]
+    level, inflow, outflow = (np.asarray(a, dtype=float) for a in (level, inflow, outflow))
+
+    # NaN compares False, so unreported values count as NORMAL
+    level_risk = (level[..., None] >= LEVEL_BANDS[idx]).sum(axis=-1)
+    flow_risk = (inflow[..., None] >= FLOW_BANDS[idx]).sum(axis=-1)
+    risk = np.maximum(level_risk, flow_risk)
+    return risk, risk.max(axis=-1), inflow - outflow
+
+def _points(data):
+    """(station, point dict) in STATIONS order"""
+    risks = data["risks"]
+    for station in STATIONS:
+        if station in history_store.BARRAGES:
+            yield station, risks["barrages"][station]
+        elif station in history_store.RIVER_STATIONS:
+            yield station, risks["stations"][station]
+        else:
+            yield station, risks[station]
+
+def classify(data):
+    """Sets risk and delta on every point and overall_risk on a report, in place"""
+    points = list(_points(data))
+    level = [p.get("level", np.nan) for _, p in points]
+    inflow = [p.get("inflow", p.get("total_inflow", np.nan)) for _, p in points]
+    outflow = [p.get("outflow", np.nan) for _, p in points]
+
+    risk, overall, delta = classify_arrays(level, inflow, outflow)
+    for (_, point), r, d in zip(points, RISK_LEVELS[risk], delta):
+        point["risk"] = str(r)
+        if not np.isnan(d):
+            point["delta"] = float(d)
+    data["overall_risk"] = str(RISK_LEVELS[overall])
+    return data
+
+def classify_readings(station, readings):
+    """Adds risk and delta to one station's history readings (history_store.query)"""
+    if not readings:
+        return readings
+    # dtype=float turns missing (None) values into NaN
+    level, inflow, outflow = (
+        np.array([r[key] for r in readings], dtype=float)[:, None]
+        for key in ("level", "inflow", "outflow")
+    )
+
+    risk, _, delta = classify_arrays(level, inflow, outflow, stations=[station])
+    for r, label, d in zip(readings, RISK_LEVELS[risk[:, 0]], delta[:, 0]):
+        r["risk"] = str(label)
+        r["delta"] = None if np.isnan(d) else float(d)
+    return readings
+
+def classify_history(date_from=None, date_to=None):
+    """Risk of every station on every stored report date, in one pass"""
+    dates, level, inflow, outflow = history_store.load_matrix(date_from, date_to)
+    if not dates:
+        return []
+
+    risk, overall, _ = classify_arrays(level, inflow, outflow)
+    labels = RISK_LEVELS[risk]
+    return [
+        {
+            "date": day,
+            "overall_risk": str(RISK_LEVELS[overall[i]]),
+            "risks": dict(zip(STATIONS, labels[i].tolist())),
+        }
+        for i, day in enumerate(dates)
+    ]
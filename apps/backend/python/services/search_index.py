@@ -0,0 +1,249 @@
+import os
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+class SearchIndex:
+    """
+    BM25 inverted index over a list of texts. Postings are stored CSR-style:
+    the documents containing term t are post_docs[offsets[t]:offsets[t + 1]],
+    with their term frequencies in post_tf. vocab is the sorted array of
+    terms, so term ids are found with a binary search and every array can
+    be saved and memory-mapped back as-is (see save/load).
+    """
+    K1 = 1.5
+    B = 0.75
+    ARRAYS = ("vocab", "offsets", "post_docs", "post_tf", "doc_len")
+
+    def __init__(self, texts):
+        postings = {}
+        doc_len = np.zeros(len(texts), dtype=np.int32)
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_len[doc_id] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        terms = sorted(postings)
+        # Tokens are [a-z0-9]+, so terms fit a fixed-width bytes array
+        self.vocab = np.array([t.encode() for t in terms], dtype=f"S{max(map(len, terms), default=1)}")
+        self.offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        self.post_docs = np.empty(sum(len(p) for p in postings.values()), dtype=np.int32)
+        self.post_tf = np.empty_like(self.post_docs)
+        pos = 0
+        for term_id, term in enumerate(terms):
+            for doc_id, tf in sorted(postings[term].items()):
+                self.post_docs[pos] = doc_id
+                self.post_tf[pos] = tf
+                pos += 1
+            self.offsets[term_id + 1] = pos
+        self.doc_len = doc_len
+        self._init_stats()
+
+    def _init_stats(self):
+        self.avgdl = max(float(self.doc_len.mean()), 1.0) if len(self.doc_len) else 1.0
+
+    @classmethod
+    def load(cls, directory):
+        """Memory-maps an index written by save(); the pages are shared by every process that loads it"""
+        index = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(index, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r'))
+        index._init_stats()
+        return index
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def term_id(self, term):
+        key = term.encode()
+        i = int(np.searchsorted(self.vocab, key))
+        if i < len(self.vocab) and self.vocab[i] == key:
+            return i
+        return None
+
+    def _term_scores(self, term):
+        """(doc ids, BM25 score) for every document containing term"""
+        term_id = self.term_id(term)
+        if term_id is None:
+            return None, None
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        docs = self.post_docs[start:end]
+        tf = self.post_tf[start:end].astype(np.float64)
+
+        n = len(self.doc_len)
+        idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+        norm = self.K1 * (1 - self.B + self.B * self.doc_len[docs] / self.avgdl)
+        return docs, idf * tf * (self.K1 + 1) / (tf + norm)
+
+    def search(self, weighted_terms, top_k=5):
+        """
+        weighted_terms: {term: weight}. Only the postings of those terms are
+        read. Returns [(score, doc id)] best first, score > 0 only.
+        """
+        return self.search_many([weighted_terms], top_k)[0]
+
+    def search_many(self, queries, top_k=5):
+        """
+        search() for a list of weighted_terms dicts, as one queries x documents
+        score matrix. Each distinct term's postings are scored once for the
+        whole batch.
+        """
+        scores = np.zeros((len(queries), len(self)))
+        term_scores = {}
+        for row, weighted_terms in zip(scores, queries):
+            for term, weight in weighted_terms.items():
+                if term not in term_scores:
+                    term_scores[term] = self._term_scores(term)
+                docs, doc_scores = term_scores[term]
+                if docs is not None:
+                    row[docs] += weight * doc_scores
+        return top_k_rows(scores, top_k)
+
+def top_k_rows(scores, top_k):
+    """[(score, doc id)] best first for each row of scores, score > 0 only"""
+    k = min(top_k, scores.shape[1])
+    if k == 0:
+        return [[] for _ in scores]
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    return [
+        [(score, doc_id) for score, doc_id in zip(row_scores.tolist(), row.tolist()) if score > 0]
+        for row, row_scores in zip(top, top_scores)
+    ]
+
+# Small hand-made synonym table for TfidfIndex: each token maps to a
+# canonical term, so "inundation losses" and "flood damages" share terms
+SYNONYMS = {
+    'floods': 'flood', 'flooding': 'flood', 'flooded': 'flood', 'inundation': 'flood',
+    'inundated': 'flood', 'deluge': 'flood', 'floodwater': 'flood', 'floodwaters': 'flood',
+    'damages': 'damage', 'damaged': 'damage', 'loss': 'damage', 'losses': 'damage',
+    'destruction': 'damage', 'destroyed': 'damage',
+    'deaths': 'casualties', 'death': 'casualties', 'died': 'casualties', 'killed': 'casualties',
+    'fatalities': 'casualties', 'dead': 'casualties', 'casualty': 'casualties',
+    'rains': 'rain', 'rainfall': 'rain', 'rainfalls': 'rain', 'precipitation': 'rain', 'downpour': 'rain',
+    'displaced': 'displacement', 'evacuated': 'evacuation', 'evacuations': 'evacuation',
+    'houses': 'housing', 'homes': 'housing', 'house': 'housing',
+    'crops': 'agriculture', 'crop': 'agriculture', 'livestock': 'agriculture',
+    'rivers': 'river', 'dams': 'dam', 'barrages': 'barrage',
+    'baluchistan': 'balochistan', 'kpk': 'kp', 'pakhtunkhwa': 'kp',
+}
+
+def tfidf_terms(text):
+    """Canonical unigrams plus adjacent bigrams ("flood damage")"""
+    tokens = [SYNONYMS.get(t, t) for t in tokenize(text)]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+class TfidfIndex:
+    """
+    Sparse TF-IDF matrix over a list of texts, one L2-normalised CSR row
+    per document: the terms of document d are indices[indptr[d]:indptr[d + 1]]
+    with weights in data. Queries are scored against every document with
+    NumPy matrix products over just the columns they use.
+    """
+    def __init__(self, texts):
+        vocab = {}
+        rows = []
+        for text in texts:
+            counts = {}
+            for term in tfidf_terms(text):
+                term_id = vocab.setdefault(term, len(vocab))
+                counts[term_id] = counts.get(term_id, 0) + 1
+            rows.append(counts)
+        self.vocab = vocab
+
+        self.indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in rows], out=self.indptr[1:])
+        self.indices = np.fromiter((t for r in rows for t in r), dtype=np.int32, count=int(self.indptr[-1]))
+        tf = np.fromiter((c for r in rows for c in r.values()), dtype=np.float64, count=int(self.indptr[-1]))
+
+        df = np.bincount(self.indices, minlength=len(vocab))
+        self.idf = np.log((1 + len(rows)) / (1 + df)) + 1
+        data = (1 + np.log(tf)) * self.idf[self.indices]
+        norms = np.sqrt(self._row_sums(data * data))
+        self.data = data / np.repeat(np.maximum(norms, 1e-12), np.diff(self.indptr))
+        self.doc_ids = np.repeat(np.arange(len(rows)), np.diff(self.indptr))
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def _row_sums(self, values):
+        """Sum of values (..., nnz) per CSR row (0 for empty rows)"""
+        sums = np.zeros(values.shape[:-1] + (len(self),))
+        nonempty = np.diff(self.indptr) > 0
+        if values.shape[-1]:
+            sums[..., nonempty] = np.add.reduceat(values, self.indptr[:-1][nonempty], axis=-1)
+        return sums
+
+    def _term_ids(self, terms):
+        return np.array([self.vocab[t] for t in terms if t in self.vocab], dtype=np.int32)
+
+    def contains_any(self, terms):
+        """Boolean mask of documents containing at least one of terms"""
+        ids = self._term_ids(SYNONYMS.get(t, t) for t in terms)
+        if not ids.size:
+            return np.zeros(len(self), dtype=bool)
+        return self._row_sums(np.isin(self.indices, ids).astype(np.float64)) > 0
+
+    def search(self, query, top_k=5, boosts=()):
+        """
+        boosts: [(terms, weight)], weight added to the score of every
+        document containing any of terms. Returns [(score, doc id)] best
+        first, score > 0 only.
+        """
+        return self.search_many([query], top_k, [boosts])[0]
+
+    def search_many(self, queries, top_k=5, boosts=None):
+        """
+        search() for a list of queries (boosts: one list per query), scored
+        with a single matrix product. Boost masks shared between queries are
+        computed once.
+        """
+        rows = []
+        for query in queries:
+            weights = {}
+            for term in tfidf_terms(query):
+                term_id = self.vocab.get(term)
+                if term_id is not None:
+                    weights[term_id] = weights.get(term_id, 0) + self.idf[term_id]
+            rows.append(weights)
+
+        # Only the columns of terms some query uses: gather them into a
+        # dense terms x documents block, then one (queries x terms) @ block
+        used = np.array(sorted({t for weights in rows for t in weights}), dtype=np.int64)
+        q = np.zeros((len(queries), len(used)))
+        for row, weights in zip(q, rows):
+            if weights:
+                row[np.searchsorted(used, list(weights))] = list(weights.values())
+        q /= np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+
+        column = np.full(len(self.vocab), -1, dtype=np.int64)
+        column[used] = np.arange(len(used))
+        pos = column[self.indices]
+        hit = pos >= 0
+        block = np.zeros((len(used), len(self)))
+        block[pos[hit], self.doc_ids[hit]] = self.data[hit]
+        scores = q @ block
+
+        masks = {}
+        for row, query_boosts in zip(scores, boosts or [()] * len(queries)):
+            for terms, weight in query_boosts:
+                key = tuple(terms)
+                if key not in masks:
+                    masks[key] = self.contains_any(terms)
+                row += weight * masks[key]
+        return top_k_rows(scores, top_k)
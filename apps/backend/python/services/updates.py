@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+# Server-sent events for flood data updates. Every open /api/flood-data/stream
+# connection is one small queue on the event loop; the scraper publishes
+# from background threads through notify().
+KEEPALIVE_SECONDS = 15
+
+_loop = None
+_subscribers = set()
+# Queued in place of the updates a slow client missed: send it a new snapshot
+_RESYNC = object()
+
+def attach(loop):
+    """Binds to the server's event loop (called from the app lifespan)"""
+    global _loop
+    _loop = loop
+
+def _points(data):
+    """{"tarbela": {...}, "barrages/sukkur": {...}, ...} for every monitored point"""
+    points = {}
+    for key, value in data.get("risks", {}).items():
+        if key in ("barrages", "stations"):
+            for name, point in value.items():
+                points[f"{key}/{name}"] = point
+        else:
+            points[key] = value
+    return points
+
+def changed_points(old, new):
+    """Points of new that differ from old (all of them if old is None)"""
+    old_points = _points(old) if old else {}
+    return {path: point for path, point in _points(new).items() if old_points.get(path) != point}
+
+def _frame(event, body):
+    return f"event: {event}\ndata: {body}\n\n".encode("utf-8")
+
+def notify(old, new):
+    """Called from any thread when a new snapshot is published"""
+    if _loop is None or not _subscribers:
+        return
+    changed = changed_points(old, new)
+    if not changed and old and old.get("date") == new.get("date"):
+        return
+
+    message = _frame("update", json.dumps({
+        "version": new.get("version"),
+        "date": new.get("date"),
+        "timestamp": new.get("timestamp"),
+        "source": new.get("source"),
+        "overall_risk": new.get("overall_risk"),
+        "changed": changed,
+    }, separators=(",", ":")))
+    _loop.call_soon_threadsafe(_broadcast, message)
+
+def _broadcast(message):
+    for queue in list(_subscribers):
+        if queue.full():
+            # Slow client: skipping updates would leave it out of sync, so
+            # drop them all and send it a fresh snapshot instead
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_RESYNC)
+        else:
+            queue.put_nowait(message)
+
+def _snapshot_frame(read_snapshot):
+    return b"event: snapshot\ndata: " + read_snapshot() + b"\n\n"
+
+async def stream(request, read_snapshot):
+    """
+    SSE body: the current snapshot first, then one 'update' event per
+    published change, with comment pings to keep proxies from timing out.
+    A client that falls too far behind gets a new snapshot event.
+
+    read_snapshot() returns the snapshot JSON bytes. It is called only once
+    the stream is subscribed, so no update between the two is lost.
+    """
+    queue = asyncio.Queue(maxsize=8)
+    _subscribers.add(queue)
+    try:
+        yield _snapshot_frame(read_snapshot)
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            yield _snapshot_frame(read_snapshot) if message is _RESYNC else message
+    finally:
+        _subscribers.discard(queue)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import tempfile
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import backfill_history
+from benchmarks.sample_reports import DEFAULT_VALUES, make_report_pdf, random_values
+from services import history_store
+
+def _serve(reports, requested):
+    """Local stand-in for pakirsa.gov.pk serving fixture PDFs by file name"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.rsplit("/", 1)[-1]
+            requested.append(name)
+            body = reports.get(name)
+            if isinstance(body, int):  # an error status instead of a report
+                status, body = body, b""
+            else:
+                status = 200 if body else 404
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_backfill():
+    values = {
+        "01-08-2025": random_values(),
+        "02-08-2025": random_values(),
+        "04-08-2025": random_values(),
+    }
+    reports = {f"Data{d}.pdf": make_report_pdf(values=v, notes_pages=1) for d, v in values.items()}
+    reports["Data05-08-2025.pdf"] = b"not a pdf"
+    reports["Data06-08-2025.pdf"] = 503
+    # A PDF with no recognisable sections, and one without the Mangla/Marala rows
+    all_sections = ("tarbela", "mangla", "rim_stations", *DEFAULT_VALUES["barrages"])
+    reports["Data07-08-2025.pdf"] = make_report_pdf(notes_pages=1, skip_sections=all_sections)
+    values["08-08-2025"] = random_values()
+    reports["Data08-08-2025.pdf"] = make_report_pdf(values=values["08-08-2025"], skip_sections=("mangla",))
+    requested = []
+    server = _serve(reports, requested)
+    url = f"http://127.0.0.1:{server.server_port}/Doc/Data{{date}}.pdf"
+
+    saved = history_store.HISTORY_DB, backfill_history.PROGRESS_FILE
+    try:
+        _run_backfill(values, requested, url)
+    finally:
+        history_store.HISTORY_DB, backfill_history.PROGRESS_FILE = saved
+        server.shutdown()
+
+def _run_backfill(values, requested, url):
+    with tempfile.TemporaryDirectory() as tmp:
+        history_store.HISTORY_DB = os.path.join(tmp, "history.db")
+        backfill_history.PROGRESS_FILE = os.path.join(tmp, "progress.json")
+
+        # Simulate a previous run interrupted after 01-08
+        backfill_history._save_progress({"01-08-2025"}, set())
+
+        done, missing = asyncio.run(backfill_history.backfill(
+            date(2025, 8, 1), date(2025, 8, 8), concurrency=2, workers=2, report_url=url))
+        assert done == {"01-08-2025", "02-08-2025", "04-08-2025", "08-08-2025"}
+        # A 404, unparseable PDF or PDF without readings is missing for good; a server error is retried
+        assert missing == {"03-08-2025", "05-08-2025", "07-08-2025"}
+        assert "Data01-08-2025.pdf" not in requested
+
+        readings = history_store.query("tarbela", date(2025, 8, 1), date(2025, 8, 31))
+        assert [r["date"] for r in readings] == ["2025-08-02", "2025-08-04", "2025-08-08"]
+        assert readings[0]["level"] == values["02-08-2025"]["tarbela"]["level"]
+        assert readings[1]["inflow"] == values["04-08-2025"]["tarbela"]["inflow"]
+        assert readings[2]["outflow"] == values["08-08-2025"]["tarbela"]["outflow"]
+
+        # Fields the partial report didn't have are NULL, not their defaults
+        mangla = history_store.query("mangla", date(2025, 8, 8), date(2025, 8, 8))
+        assert mangla == [{"date": "2025-08-08", "level": None, "inflow": None, "outflow": None}]
+
+        # Resuming only retries the date that failed with a server error
+        requested.clear()
+        asyncio.run(backfill_history.backfill(
+            date(2025, 8, 1), date(2025, 8, 8), workers=2, report_url=url))
+        assert requested == ["Data06-08-2025.pdf"]
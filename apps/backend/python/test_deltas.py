@@ -0,0 +1,55 @@
+import json
+
+from services import deltas
+
+def _data(version, **tarbela):
+    return {"version": version, "date": "01-08-2025", "risks": {"tarbela": dict({"level": 1500.0, "inflow": 20000}, **tarbela)}}
+
+def _record(*snapshots):
+    deltas._versions.clear()
+    deltas._encoded.clear()
+    for data in snapshots:
+        deltas.record(data)
+
+def _body(since, data):
+    return json.loads(deltas.encoded_delta(since, data)["identity"])
+
+def test_diff():
+    old = {"a": 1, "b": {"c": 2, "d": 3}, "gone": True}
+    new = {"a": 1, "b": {"c": 5, "d": 3}, "added": [1]}
+    assert deltas.diff(old, new) == [
+        {"op": "replace", "path": "/b/c", "value": 5},
+        {"op": "add", "path": "/added", "value": [1]},
+        {"op": "remove", "path": "/gone"},
+    ]
+    assert deltas.diff(new, new) == []
+
+def test_patch_since_known_version():
+    v1, v2 = _data(1), _data(2, level=1510.5)
+    _record(v1, v2)
+    body = _body(1, v2)
+    assert body["type"] == "patch" and body["since"] == 1 and body["version"] == 2
+    assert body["patch"] == [
+        {"op": "replace", "path": "/version", "value": 2},
+        {"op": "replace", "path": "/risks/tarbela/level", "value": 1510.5},
+    ]
+
+def test_since_current_version():
+    v1 = _data(1)
+    _record(v1)
+    assert _body(1, v1) == {"type": "patch", "since": 1, "version": 1, "patch": []}
+
+def test_since_ahead_of_version():
+    # e.g. a client that saw a newer version from another worker
+    v1 = _data(1)
+    _record(v1)
+    assert _body(5, v1) == {"type": "snapshot", "version": 1, "data": v1}
+
+def test_since_older_than_history():
+    snapshots = [_data(v, inflow=v) for v in range(1, deltas.DELTA_HISTORY + 3)]
+    _record(*snapshots)
+    latest = snapshots[-1]
+    assert _body(1, latest)["type"] == "snapshot"
+    assert _body(3, latest)["type"] == "patch"
+    # Every unknown since shares one encoded snapshot
+    assert deltas.encoded_delta(1, latest) is deltas.encoded_delta(2, latest)
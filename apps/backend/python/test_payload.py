@@ -0,0 +1,43 @@
+import gzip
+import json
+
+from starlette.requests import Request
+
+from services import payload
+
+DATA = {"version": 3, "risks": {"tarbela": {"level": 1500.5}}}
+
+def _request(**headers):
+    return Request({"type": "http", "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]})
+
+def test_encode():
+    encoded = payload.encode(DATA)
+    assert json.loads(encoded["identity"]) == DATA
+    assert gzip.decompress(encoded["gzip"]) == encoded["identity"]
+    assert encoded["etag"] == payload.encode(dict(DATA))["etag"]
+    assert encoded["etag"] != payload.encode(dict(DATA, version=4))["etag"]
+
+def test_not_modified():
+    encoded = payload.encode(DATA)
+    etag = encoded["etag"]
+    for if_none_match in (etag, f"W/{etag}", "*", f'"other", {etag}'):
+        response = payload.respond(_request(if_none_match=if_none_match), encoded)
+        assert response.status_code == 304 and response.headers["etag"] == etag
+    assert payload.respond(_request(if_none_match='"other"'), encoded).status_code == 200
+
+def test_content_encoding():
+    encoded = payload.encode(DATA)
+    response = payload.respond(_request(accept_encoding="gzip, deflate"), encoded)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.body == encoded["gzip"]
+
+    if "br" in encoded:
+        assert payload.respond(_request(accept_encoding="gzip, br"), encoded).headers["content-encoding"] == "br"
+        response = payload.respond(_request(accept_encoding="br;q=0, gzip;q=0.5"), encoded)
+        assert response.headers["content-encoding"] == "gzip"
+
+    # q=0 refuses an encoding
+    response = payload.respond(_request(accept_encoding="gzip;q=0"), encoded)
+    assert "content-encoding" not in response.headers
+    assert response.body == encoded["identity"]
+    assert payload.respond(_request(), encoded).body == encoded["identity"]
@@ -0,0 +1,62 @@
+import random
+
+from benchmarks.sample_reports import make_report_text, random_values
+from services.scraper import parse_pdf_text, tokenize_report
+
+def _values():
+    return random_values(random.Random(7))
+
+def test_all_fields():
+    values = _values()
+    data = parse_pdf_text(make_report_text(values))
+    risks = data["risks"]
+    assert data["defaulted_fields"] == []
+    assert risks["tarbela"]["level"] == values["tarbela"]["level"]
+    assert risks["mangla"]["outflow"] == values["mangla"]["outflow"]
+    assert risks["stations"]["nowshera"]["inflow"] == values["nowshera"]["discharge"]
+    assert risks["stations"]["marala"]["outflow"] == values["marala"]["ds"]
+    assert risks["barrages"]["kotri"]["inflow"] == values["barrages"]["kotri"][0]
+    assert risks["rim_stations"]["total_inflow"] == values["rim_total"]
+
+def test_missing_dam_label_does_not_take_next_section():
+    values = _values()
+    text = make_report_text(values).replace(f"LEVEL = {values['tarbela']['level']:.2f} FEET ", "")
+    found = tokenize_report(text)
+    assert ("tarbela", "level") not in found
+    assert found[("mangla", "level")] == values["mangla"]["level"]
+    assert found[("stations", "nowshera", "inflow")] == values["nowshera"]["discharge"]
+
+    data = parse_pdf_text(text)
+    assert data["defaulted_fields"] == ["tarbela.level"]
+    assert data["risks"]["mangla"]["level"] == values["mangla"]["level"]
+
+def test_missing_barrage_label_does_not_take_next_section():
+    values = _values()
+    us, ds = values["barrages"]["kalabagh"]
+    text = make_report_text(values).replace(f" D/S DISCHARGE = {ds:,} Cs", "", 1)
+    found = tokenize_report(text)
+    assert found[("barrages", "kalabagh", "inflow")] == us
+    assert ("barrages", "kalabagh", "outflow") not in found
+    assert found[("barrages", "chashma", "outflow")] == values["barrages"]["chashma"][1]
+    assert found[("barrages", "taunsa", "outflow")] == values["barrages"]["taunsa"][1]
+
+def test_missing_section():
+    values = _values()
+    found = tokenize_report(make_report_text(values, skip_sections=("mangla",)))
+    assert ("mangla", "level") not in found
+    assert ("stations", "marala", "inflow") not in found
+    assert found[("tarbela", "outflow")] == values["tarbela"]["outflow"]
+    assert found[("barrages", "kalabagh", "inflow")] == values["barrages"]["kalabagh"][0]
+
+def test_columnar_layout():
+    # Two sections on one header line, their values on the lines below
+    text = "\n".join([
+        "INDUS @ TARBELA KABUL @ NOWSHERA",
+        "LEVEL = 1500.50 FEET MEAN DISCHARGE = 9,100 Cs",
+        "MEAN INFLOW = 25,000 Cs",
+        "MEAN OUTFLOW = 30,000 Cs",
+    ])
+    found = tokenize_report(text)
+    assert found[("tarbela", "level")] == 1500.50
+    assert found[("tarbela", "inflow")] == 25000
+    assert found[("stations", "nowshera", "outflow")] == 9100